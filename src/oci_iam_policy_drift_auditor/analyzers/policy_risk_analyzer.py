@@ -1,53 +1,78 @@
 ﻿from __future__ import annotations
 
 from collections import Counter
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import attrgetter, itemgetter
 import re
 from typing import Any
 
+from ..models import PolicyRow
+
 
 class PolicyRiskAnalyzer:
     _severity_rank = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
 
-    _risk_rules: list[tuple[str, re.Pattern[str], str]] = [
+    _risk_rules: list[tuple[str, str, str, str]] = [
         (
+            "critical_tenancy_manage_all",
             "CRITICAL",
-            re.compile(r"\bmanage\s+all-resources\s+in\s+tenancy\b", re.IGNORECASE),
+            r"\bmanage\s+all-resources\s+in\s+tenancy\b",
             "Statement allows tenancy-wide management of all resources.",
         ),
         (
+            "high_wildcard_group",
             "HIGH",
-            re.compile(r"\ballow\s+group\s+\*\s+to\b|\ballow\s+any-group\s+to\b", re.IGNORECASE),
+            r"\ballow\s+group\s+\*\s+to\b|\ballow\s+any-group\s+to\b",
             "Statement uses wildcard group principal.",
         ),
         (
+            "high_manage_policies",
             "HIGH",
-            re.compile(r"\bto\s+manage\s+policies\b", re.IGNORECASE),
+            r"\bto\s+manage\s+policies\b",
             "Statement can manage IAM policies.",
         ),
         (
+            "high_manage_groups",
             "HIGH",
-            re.compile(r"\bto\s+manage\s+groups\b", re.IGNORECASE),
+            r"\bto\s+manage\s+groups\b",
             "Statement can manage IAM groups.",
         ),
         (
+            "high_manage_users",
             "HIGH",
-            re.compile(r"\bto\s+manage\s+users\b", re.IGNORECASE),
+            r"\bto\s+manage\s+users\b",
             "Statement can manage IAM users.",
         ),
         (
+            "medium_compartment_manage_all",
             "MEDIUM",
-            re.compile(r"\bmanage\s+all-resources\s+in\s+compartment\b", re.IGNORECASE),
+            r"\bmanage\s+all-resources\s+in\s+compartment\b",
             "Statement allows compartment-wide management of all resources.",
         ),
         (
+            "low_use_all",
             "LOW",
-            re.compile(r"\bto\s+use\s+all-resources\b", re.IGNORECASE),
+            r"\bto\s+use\s+all-resources\b",
             "Statement allows broad usage of all resources.",
         ),
     ]
 
-    _group_ref = re.compile(r"\ballow\s+group\s+([a-z0-9_.\-]+)\s+to\b", re.IGNORECASE)
+    _risk_rule_severity = {tag: severity for tag, severity, _, _ in _risk_rules}
+
+    # Every rule needs at least one of these, so statements without any of them skip the regex entirely.
+    _trigger_substrings = ("manage", "all-resources", "any-group", "*")
+
+    # Lookahead branches keep matches zero-width, so rules that match at different offsets are all reported in
+    # one pass. At any single offset only the first matching branch is reported, so a new rule must never be able
+    # to match at the same offset as an existing one (or the group reference branch), or one of them stops firing.
+    # Patterns are lowercase and matched against the lowercased statement, so no IGNORECASE is needed.
+    _statement_pattern = re.compile(
+        "|".join(
+            [f"(?=(?P<{tag}>{source}))" for tag, _, source, _ in _risk_rules]
+            + [r"(?=(?P<group_ref>\ballow\s+group\s+(?P<group_name>[a-z0-9_.\-]+)\s+to\b))"]
+        )
+    )
 
     _policy_event_terms = {
         "createpolicy",
@@ -61,14 +86,22 @@ class PolicyRiskAnalyzer:
         "deletedynamicgroup",
     }
 
+    _policy_event_pattern = re.compile("|".join(re.escape(term) for term in sorted(_policy_event_terms)))
+    _non_alnum = re.compile(r"[\W_]+")
+
+    _utc_offset = timedelta(0)
+
+    def __init__(self, stop_on_critical: bool = False) -> None:
+        self.stop_on_critical = stop_on_critical
+
     def analyze(
         self,
         generated_at: datetime,
         region: str,
         tenancy_ocid: str,
         audit_lookback_hours: int,
-        compartments: list[Any],
-        policy_inventory: list[dict[str, Any]],
+        compartments_by_id: dict[str, Any],
+        policies: list[PolicyRow],
         groups: list[Any],
         users: list[Any],
         memberships: list[Any],
@@ -77,60 +110,60 @@ class PolicyRiskAnalyzer:
         skipped_compartments: list[dict[str, str]],
     ) -> dict[str, Any]:
         group_name_by_id = {group.id: group.name for group in groups}
-        group_member_counts: Counter[str] = Counter()
-        for membership in memberships:
-            group_member_counts[membership.group_id] += 1
+        group_id_by_name: dict[str, str] = {}
+        for group in groups:
+            group_id_by_name.setdefault(group.name.lower(), group.id)
+        group_member_counts: Counter[str] = Counter(membership.group_id for membership in memberships)
 
-        risky_policies: list[dict[str, Any]] = []
+        risky_rows: list[tuple[tuple[int, str, str], dict[str, Any]]] = []
 
-        for item in policy_inventory:
-            policy = item["policy"]
-            compartment = item["compartment"]
+        for policy in policies:
+            compartment = compartments_by_id[policy.compartment_id]
+            compartment_sort_name = compartment.name.lower()
+            policy_sort_name = policy.name.lower()
 
-            for statement in policy.statements or []:
-                match = self._evaluate_statement(statement)
+            for statement in policy.statements:
+                match = self._evaluate_statement(statement, self.stop_on_critical)
                 if not match:
                     continue
 
-                referenced_group = self._extract_group_name(statement)
+                referenced_group = match["referenced_group"]
                 referenced_group_member_count = None
                 if referenced_group:
-                    group_id = self._find_group_id_by_name(groups, referenced_group)
+                    group_id = group_id_by_name.get(match["referenced_group_key"])
                     if group_id:
                         referenced_group_member_count = group_member_counts.get(group_id, 0)
 
-                risky_policies.append(
-                    {
-                        "risk_level": match["risk_level"],
-                        "reasons": match["reasons"],
-                        "compartment_id": compartment.id,
-                        "compartment_name": compartment.name,
-                        "policy_id": policy.id,
-                        "policy_name": policy.name,
-                        "policy_description": policy.description,
-                        "statement": statement,
-                        "referenced_group": referenced_group,
-                        "referenced_group_member_count": referenced_group_member_count,
-                    }
-                )
-
-        risky_policies.sort(
-            key=lambda item: (
-                self._severity_rank.get(item["risk_level"], 9),
-                item["compartment_name"].lower(),
-                item["policy_name"].lower(),
-            )
-        )
+                sort_key = (self._severity_rank.get(match["risk_level"], 9), compartment_sort_name, policy_sort_name)
+                risky_policy = {
+                    "risk_level": match["risk_level"],
+                    "reasons": list(match["reasons"]),
+                    "compartment_id": compartment.id,
+                    "compartment_name": compartment.name,
+                    "policy_id": policy.id,
+                    "policy_name": policy.name,
+                    "policy_description": policy.description,
+                    "statement": statement,
+                    "referenced_group": referenced_group,
+                    "referenced_group_member_count": referenced_group_member_count,
+                }
+                risky_rows.append((sort_key, risky_policy))
 
-        parsed_events = [self._normalize_audit_event(event) for event in audit_events]
-        identity_events = [event for event in parsed_events if "identity" in event["event_type"].lower()]
+        risky_rows.sort(key=itemgetter(0))
+        risky_policies = [row for _, row in risky_rows]
+
+        identity_events = [
+            self._normalize_audit_event(event)
+            for event in audit_events
+            if "identity" in (getattr(event, "event_type", "") or "").lower()
+        ]
         policy_change_events = [event for event in identity_events if self._is_policy_change_event(event)]
         policy_change_events.sort(key=lambda item: item["event_time_utc"], reverse=True)
 
         risky_by_severity = Counter(item["risk_level"] for item in risky_policies)
         policy_counts_by_compartment = Counter(item["compartment_name"] for item in risky_policies)
 
-        mfa_enabled = sum(1 for user in users if bool(getattr(user, "is_mfa_activated", False)))
+        mfa_enabled = sum(map(bool, map(attrgetter("is_mfa_activated"), users)))
 
         return {
             "metadata": {
@@ -141,9 +174,9 @@ class PolicyRiskAnalyzer:
                 "audit_lookback_hours": audit_lookback_hours,
             },
             "summary": {
-                "scanned_compartment_count": len(compartments),
+                "scanned_compartment_count": len(compartments_by_id),
                 "skipped_compartment_count": len(skipped_compartments),
-                "total_policies_scanned": len(policy_inventory),
+                "total_policies_scanned": len(policies),
                 "risky_statement_count": len(risky_policies),
                 "risky_statement_count_by_severity": dict(risky_by_severity),
                 "identity_audit_event_count": len(identity_events),
@@ -160,42 +193,69 @@ class PolicyRiskAnalyzer:
             "group_membership_summary": self._build_group_summary(groups, group_name_by_id, group_member_counts),
         }
 
-    def _evaluate_statement(self, statement: str) -> dict[str, Any] | None:
-        reasons: list[str] = []
-        severities: list[str] = []
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def _evaluate_statement(cls, statement: str, stop_on_critical: bool = False) -> dict[str, Any] | None:
+        statement_lower = statement.lower()
+        if not any(trigger in statement_lower for trigger in cls._trigger_substrings):
+            return None
 
-        for severity, pattern, reason in self._risk_rules:
-            if pattern.search(statement):
-                reasons.append(reason)
-                severities.append(severity)
+        matched_tags: set[str] = set()
+        group_span: tuple[int, int] | None = None
+
+        for match in cls._statement_pattern.finditer(statement_lower):
+            tag = match.lastgroup
+            if tag == "group_ref":
+                if group_span is None:
+                    group_span = match.span("group_name")
+            else:
+                matched_tags.add(tag)
+                if stop_on_critical and cls._risk_rule_severity[tag] == "CRITICAL":
+                    break
 
-        if not reasons:
+        if not matched_tags:
             return None
 
-        highest = min(severities, key=lambda level: self._severity_rank[level])
-        return {"risk_level": highest, "reasons": reasons}
+        referenced_group = None
+        referenced_group_key = None
+        if group_span:
+            referenced_group_key = statement_lower[group_span[0] : group_span[1]]
+            # Slice the original text to keep the group's casing, unless lower() changed the length.
+            if len(statement) == len(statement_lower):
+                referenced_group = statement[group_span[0] : group_span[1]]
+            else:
+                referenced_group = referenced_group_key
 
-    def _extract_group_name(self, statement: str) -> str | None:
-        match = self._group_ref.search(statement)
-        return match.group(1) if match else None
+        reasons: list[str] = []
+        severities: list[str] = []
+        for tag, severity, _, reason in cls._risk_rules:
+            if tag in matched_tags:
+                reasons.append(reason)
+                severities.append(severity)
 
-    def _find_group_id_by_name(self, groups: list[Any], group_name: str) -> str | None:
-        target = group_name.strip().lower()
-        for group in groups:
-            if group.name.lower() == target:
-                return group.id
-        return None
+        highest = min(severities, key=lambda level: cls._severity_rank[level])
+        return {
+            "risk_level": highest,
+            "reasons": tuple(reasons),
+            "referenced_group": referenced_group,
+            "referenced_group_key": referenced_group_key,
+        }
 
     def _normalize_audit_event(self, event: Any) -> dict[str, Any]:
         data = getattr(event, "data", None)
         if not isinstance(data, dict):
             data = {}
 
-        identity = data.get("identity") if isinstance(data.get("identity"), dict) else {}
+        identity = data.get("identity")
+        if not isinstance(identity, dict):
+            identity = {}
 
         event_time = getattr(event, "event_time", None)
         if isinstance(event_time, datetime):
-            event_time_utc = event_time.astimezone(timezone.utc).isoformat()
+            if event_time.tzinfo is timezone.utc or event_time.utcoffset() == self._utc_offset:
+                event_time_utc = event_time.isoformat()
+            else:
+                event_time_utc = event_time.astimezone(timezone.utc).isoformat()
         else:
             event_time_utc = ""
 
@@ -213,8 +273,8 @@ class PolicyRiskAnalyzer:
 
     def _is_policy_change_event(self, event: dict[str, Any]) -> bool:
         candidate = f"{event['event_type']} {event['event_name']}"
-        normalized = "".join(ch for ch in candidate.lower() if ch.isalnum())
-        return any(term in normalized for term in self._policy_event_terms)
+        normalized = self._non_alnum.sub("", candidate.lower())
+        return self._policy_event_pattern.search(normalized) is not None
 
     def _build_group_summary(
         self,
@@ -222,15 +282,14 @@ class PolicyRiskAnalyzer:
         group_name_by_id: dict[str, str],
         group_member_counts: Counter[str],
     ) -> list[dict[str, Any]]:
-        summary = []
-        for group in groups:
-            summary.append(
-                {
-                    "group_id": group.id,
-                    "group_name": group_name_by_id.get(group.id, group.id),
-                    "member_count": group_member_counts.get(group.id, 0),
-                }
-            )
+        summary = [
+            {
+                "group_id": group.id,
+                "group_name": group_name_by_id.get(group.id, group.id),
+                "member_count": group_member_counts.get(group.id, 0),
+            }
+            for group in groups
+        ]
 
-        summary.sort(key=lambda item: item["member_count"], reverse=True)
+        summary.sort(key=itemgetter("member_count"), reverse=True)
         return summary
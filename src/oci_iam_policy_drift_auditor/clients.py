@@ -19,8 +19,18 @@ def create_oci_config(app_config: AppConfig) -> dict[str, Any]:
     return config
 
 
-def create_clients(oci_config: dict[str, Any]) -> dict[str, Any]:
-    retry = oci.retry.DEFAULT_RETRY_STRATEGY
+def create_retry_strategy(app_config: AppConfig) -> Any:
+    return oci.retry.RetryStrategyBuilder(
+        max_attempts=app_config.retry_max_attempts,
+        total_elapsed_time_seconds=600,
+        service_error_retry_config=oci.retry.retry_checkers.RETRYABLE_STATUSES_AND_CODES,
+        service_error_retry_on_any_5xx=True,
+        backoff_type=oci.retry.BACKOFF_FULL_JITTER_EQUAL_ON_THROTTLE_VALUE,
+    ).get_retry_strategy()
+
+
+def create_clients(oci_config: dict[str, Any], app_config: AppConfig) -> dict[str, Any]:
+    retry = create_retry_strategy(app_config)
     return {
         "identity": oci.identity.IdentityClient(oci_config, retry_strategy=retry),
         "audit": oci.audit.AuditClient(oci_config, retry_strategy=retry),
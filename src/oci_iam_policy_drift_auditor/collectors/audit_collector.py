@@ -1,9 +1,9 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterator
 
-from oci.pagination import list_call_get_all_results
+from oci.pagination import list_call_get_all_results_generator
 
 
 class AuditCollector:
@@ -15,10 +15,11 @@ class AuditCollector:
         compartment_ocid: str,
         start_time: datetime,
         end_time: datetime,
-    ) -> list[Any]:
-        return list_call_get_all_results(
+    ) -> Iterator[Any]:
+        yield from list_call_get_all_results_generator(
             self.audit_client.list_events,
+            "record",
             compartment_id=compartment_ocid,
             start_time=start_time,
             end_time=end_time,
-        ).data
+        )
@@ -1,15 +1,19 @@
 ﻿from __future__ import annotations
 
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
+from typing import Any, Iterable, Iterator
 
-from oci.pagination import list_call_get_all_results
+from oci.pagination import list_call_get_all_results, list_call_get_all_results_generator
 
-from ..models import CompartmentInfo
+from ..models import CompartmentInfo, PolicyRow
 
 
 class IdentityCollector:
-    def __init__(self, identity_client: Any) -> None:
+    def __init__(self, identity_client: Any, max_workers: int = 16) -> None:
         self.identity_client = identity_client
+        self.max_workers = max_workers
 
     def list_compartments(
         self,
@@ -21,6 +25,9 @@ class IdentityCollector:
 
         if root_compartment_ocid:
             root = self.identity_client.get_compartment(root_id).data
+            lifecycle_state = getattr(root, "lifecycle_state", "ACTIVE")
+            if lifecycle_state != "ACTIVE":
+                raise ValueError(f"Root compartment {root_id} is {lifecycle_state}")
             root_name = root.name
         else:
             tenancy = self.identity_client.get_tenancy(tenancy_ocid).data
@@ -40,43 +47,47 @@ class IdentityCollector:
                 for item in response.data:
                     compartments.append(CompartmentInfo(id=item.id, name=item.name))
             else:
-                queue = [root_id]
-                visited: set[str] = set()
-                while queue:
-                    parent_id = queue.pop(0)
-                    if parent_id in visited:
-                        continue
-                    visited.add(parent_id)
-
-                    response = list_call_get_all_results(
-                        self.identity_client.list_compartments,
-                        compartment_id=parent_id,
-                        compartment_id_in_subtree=False,
-                        access_level="ACCESSIBLE",
-                        lifecycle_state="ACTIVE",
-                    )
-                    for item in response.data:
-                        compartments.append(CompartmentInfo(id=item.id, name=item.name))
-                        queue.append(item.id)
+                visited: set[str] = {root_id}
+                level = [root_id]
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    while level:
+                        next_level: list[str] = []
+                        for children in executor.map(self._list_child_compartments, level):
+                            for item in children:
+                                compartments.append(CompartmentInfo(id=item.id, name=item.name))
+                                if item.id not in visited:
+                                    visited.add(item.id)
+                                    next_level.append(item.id)
+                        level = next_level
         else:
-            response = list_call_get_all_results(
-                self.identity_client.list_compartments,
-                compartment_id=root_id,
-                compartment_id_in_subtree=False,
-                access_level="ACCESSIBLE",
-                lifecycle_state="ACTIVE",
-            )
-            for item in response.data:
+            for item in self._list_child_compartments(root_id):
                 compartments.append(CompartmentInfo(id=item.id, name=item.name))
 
         unique = {item.id: item for item in compartments}
         return sorted(unique.values(), key=lambda item: item.name.lower())
 
-    def list_policies(self, compartment_ocid: str) -> list[Any]:
+    def _list_child_compartments(self, parent_id: str) -> list[Any]:
         return list_call_get_all_results(
+            self.identity_client.list_compartments,
+            compartment_id=parent_id,
+            compartment_id_in_subtree=False,
+            access_level="ACCESSIBLE",
+            lifecycle_state="ACTIVE",
+        ).data
+
+    def list_policies(self, compartment_ocid: str) -> Iterator[PolicyRow]:
+        for policy in list_call_get_all_results_generator(
             self.identity_client.list_policies,
+            "record",
             compartment_id=compartment_ocid,
-        ).data
+        ):
+            yield PolicyRow(
+                compartment_id=compartment_ocid,
+                id=policy.id,
+                name=policy.name,
+                description=policy.description,
+                statements=tuple(policy.statements or ()),
+            )
 
     def list_groups(self, tenancy_ocid: str) -> list[Any]:
         return list_call_get_all_results(
@@ -90,25 +101,20 @@ class IdentityCollector:
             compartment_id=tenancy_ocid,
         ).data
 
-    def list_user_group_memberships_for_users(self, tenancy_ocid: str, user_ids: list[str]) -> list[Any]:
-        memberships: list[Any] = []
-        seen: set[str] = set()
+    def list_user_group_memberships_for_groups(self, tenancy_ocid: str, group_ids: Iterable[str]) -> list[Any]:
+        list_for_group = partial(self._list_user_group_memberships_for_group, tenancy_ocid)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            memberships = chain.from_iterable(executor.map(list_for_group, group_ids))
+            unique = {getattr(membership, "id", None) or id(membership): membership for membership in memberships}
 
-        for user_id in user_ids:
-            response = list_call_get_all_results(
-                self.identity_client.list_user_group_memberships,
-                compartment_id=tenancy_ocid,
-                user_id=user_id,
-            )
-            for membership in response.data:
-                membership_id = getattr(membership, "id", None)
-                if membership_id and membership_id in seen:
-                    continue
-                if membership_id:
-                    seen.add(membership_id)
-                memberships.append(membership)
-
-        return memberships
+        return list(unique.values())
+
+    def _list_user_group_memberships_for_group(self, tenancy_ocid: str, group_id: str) -> list[Any]:
+        return list_call_get_all_results(
+            self.identity_client.list_user_group_memberships,
+            compartment_id=tenancy_ocid,
+            group_id=group_id,
+        ).data
 
     def list_dynamic_groups(self, tenancy_ocid: str) -> list[Any]:
         return list_call_get_all_results(
@@ -2,6 +2,7 @@
 
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -33,8 +34,16 @@ class AppConfig:
     object_storage_prefix: str
     auto_discover_bucket: bool
     fail_on_upload_error: bool
+    stop_on_critical: bool
+    max_parallel_requests: int
+    retry_max_attempts: int
+    discovery_cache_file: Path | None
+    gzip_json_upload: bool
+    max_bucket_candidates: int
+    log_level: str
 
     @classmethod
+    @lru_cache(maxsize=1)
     def from_env(cls) -> "AppConfig":
         load_dotenv(override=False)
 
@@ -43,6 +52,11 @@ class AppConfig:
         oci_config_file = os.getenv("OCI_CONFIG_FILE", "").strip() or config_file_default
         oci_config_profile = os.getenv("OCI_CONFIG_PROFILE", "").strip() or "DEFAULT"
 
+        discovery_cache_file = None
+        if _to_bool(os.getenv("OCI_USE_DISCOVERY_CACHE"), True):
+            cache_file_default = Path.home() / ".cache" / "oci-iam-drift" / "ns_cache.json"
+            discovery_cache_file = Path(os.getenv("OCI_DISCOVERY_CACHE_FILE", "").strip() or cache_file_default)
+
         return cls(
             oci_config_file=oci_config_file,
             oci_config_profile=oci_config_profile,
@@ -56,4 +70,11 @@ class AppConfig:
             object_storage_prefix=os.getenv("OCI_OBJECT_STORAGE_PREFIX", "iam-policy-drift-audit").strip("/"),
             auto_discover_bucket=_to_bool(os.getenv("OCI_AUTO_DISCOVER_BUCKET"), True),
             fail_on_upload_error=_to_bool(os.getenv("OCI_FAIL_ON_UPLOAD_ERROR"), True),
+            stop_on_critical=_to_bool(os.getenv("OCI_STOP_ON_CRITICAL"), False),
+            max_parallel_requests=max(1, _to_int(os.getenv("OCI_MAX_PARALLEL_REQUESTS"), 16)),
+            retry_max_attempts=max(1, _to_int(os.getenv("OCI_RETRY_MAX_ATTEMPTS"), 8)),
+            discovery_cache_file=discovery_cache_file,
+            gzip_json_upload=_to_bool(os.getenv("OCI_GZIP_JSON_UPLOAD"), False),
+            max_bucket_candidates=max(1, _to_int(os.getenv("OCI_MAX_BUCKET_CANDIDATES"), 3)),
+            log_level=os.getenv("OCI_LOG_LEVEL", "").strip().upper() or "INFO",
         )
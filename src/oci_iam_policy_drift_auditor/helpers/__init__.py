@@ -1,4 +1,12 @@
-﻿from .object_storage_uploader import ObjectStorageUploader
-from .output_writer import write_json_report, write_markdown_report
+﻿from .cache import get_cached, invalidate_cached
+from .object_storage_uploader import ObjectStorageUploader
+from .output_writer import write_gzip_copy, write_json_report, write_markdown_report
 
-__all__ = ["ObjectStorageUploader", "write_json_report", "write_markdown_report"]
+__all__ = [
+    "ObjectStorageUploader",
+    "get_cached",
+    "invalidate_cached",
+    "write_gzip_copy",
+    "write_json_report",
+    "write_markdown_report",
+]
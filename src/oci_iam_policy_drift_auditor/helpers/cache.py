@@ -0,0 +1,50 @@
+﻿from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+
+def get_cached(cache_path: Path | None, key: str, ttl_seconds: int, producer: Callable[[], Any]) -> Any:
+    if cache_path is None:
+        return producer()
+
+    entries = _read_cache(cache_path)
+    entry = entries.get(key)
+    now = time.time()
+    if isinstance(entry, dict) and "value" in entry and now - entry.get("stored_at", 0) < ttl_seconds:
+        return entry["value"]
+
+    value = producer()
+    if value:
+        entries[key] = {"stored_at": now, "value": value}
+        _write_cache(cache_path, entries)
+    return value
+
+
+def invalidate_cached(cache_path: Path | None, key: str) -> None:
+    if cache_path is None:
+        return
+
+    entries = _read_cache(cache_path)
+    if entries.pop(key, None) is not None:
+        _write_cache(cache_path, entries)
+
+
+def _read_cache(cache_path: Path) -> dict[str, Any]:
+    try:
+        entries = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def _write_cache(cache_path: Path, entries: dict[str, Any]) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+        temp_path.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+        temp_path.replace(cache_path)
+    except OSError:
+        pass
@@ -3,27 +3,52 @@
 from pathlib import Path
 from typing import Any
 
+from oci.object_storage import UploadManager
+
 from ..models import UploadResult
 
 
 class ObjectStorageUploader:
+    _multipart_threshold_bytes = 10 * 1024 * 1024
+    _multipart_part_size_bytes = 8 * 1024 * 1024
+    _parallel_part_uploads = 4
+
     def __init__(self, object_storage_client: Any, namespace: str, bucket: str, prefix: str) -> None:
         self.object_storage_client = object_storage_client
         self.namespace = namespace
         self.bucket = bucket
         self.prefix = prefix.strip("/")
 
-    def upload_file(self, file_path: Path, content_type: str) -> UploadResult:
+    def upload_file(self, file_path: Path, content_type: str, content_encoding: str | None = None) -> UploadResult:
         object_name = f"{self.prefix}/{file_path.name}" if self.prefix else file_path.name
 
-        with file_path.open("rb") as stream:
-            self.object_storage_client.put_object(
+        extra_kwargs = {"content_encoding": content_encoding} if content_encoding else {}
+
+        if file_path.stat().st_size > self._multipart_threshold_bytes:
+            upload_manager = UploadManager(
+                self.object_storage_client,
+                allow_parallel_uploads=True,
+                parallel_process_count=self._parallel_part_uploads,
+            )
+            upload_manager.upload_file(
                 namespace_name=self.namespace,
                 bucket_name=self.bucket,
                 object_name=object_name,
-                put_object_body=stream,
+                file_path=str(file_path),
+                part_size=self._multipart_part_size_bytes,
                 content_type=content_type,
+                **extra_kwargs,
             )
+        else:
+            with file_path.open("rb") as stream:
+                self.object_storage_client.put_object(
+                    namespace_name=self.namespace,
+                    bucket_name=self.bucket,
+                    object_name=object_name,
+                    put_object_body=stream,
+                    content_type=content_type,
+                    **extra_kwargs,
+                )
 
         return UploadResult(
             namespace=self.namespace,
@@ -1,13 +1,26 @@
 ﻿from __future__ import annotations
 
-import json
+import gzip
+from itertools import islice
 from pathlib import Path
+import shutil
 from typing import Any
 
+import orjson
+
+_json_options = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_DATACLASS | orjson.OPT_NAIVE_UTC
+
 
 def write_json_report(report: dict[str, Any], output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    output_path.write_bytes(orjson.dumps(report, option=_json_options))
+
+
+def write_gzip_copy(source_path: Path) -> Path:
+    gzip_path = source_path.with_name(f"{source_path.name}.gz")
+    with source_path.open("rb") as source, gzip.open(gzip_path, "wb", compresslevel=6) as target:
+        shutil.copyfileobj(source, target)
+    return gzip_path
 
 
 def write_markdown_report(report: dict[str, Any], output_path: Path) -> None:
@@ -16,82 +29,96 @@ def write_markdown_report(report: dict[str, Any], output_path: Path) -> None:
 
 
 def _to_markdown(report: dict[str, Any]) -> str:
-    metadata = report["metadata"]
-    summary = report["summary"]
-
-    lines: list[str] = []
-    lines.append("# OCI IAM Policy Drift Auditor Report")
-    lines.append("")
-    lines.append(f"- Generated (UTC): `{metadata['generated_at_utc']}`")
-    lines.append(f"- Region: `{metadata['region']}`")
-    lines.append(f"- Tenancy: `{metadata['tenancy_ocid']}`")
-    lines.append(f"- Audit Lookback (hours): `{metadata['audit_lookback_hours']}`")
-    lines.append("")
-
-    lines.append("## Summary")
-    lines.append("")
-    lines.append("| Metric | Value |")
-    lines.append("|---|---:|")
-    lines.append(f"| Scanned Compartments | {summary['scanned_compartment_count']} |")
-    lines.append(f"| Skipped Compartments | {summary['skipped_compartment_count']} |")
-    lines.append(f"| Policies Scanned | {summary['total_policies_scanned']} |")
-    lines.append(f"| Risky Statements | {summary['risky_statement_count']} |")
-    lines.append(f"| Identity Audit Events | {summary['identity_audit_event_count']} |")
-    lines.append(f"| Policy Change Events | {summary['policy_change_event_count']} |")
-    lines.append(f"| Tenancy Users | {summary['tenancy_user_count']} |")
-    lines.append(f"| Users with MFA Enabled | {summary['tenancy_user_mfa_enabled_count']} |")
-    lines.append("")
-
-    lines.append("## Risk Severity")
-    lines.append("")
-    lines.append("| Severity | Count |")
-    lines.append("|---|---:|")
-    for severity in ["CRITICAL", "HIGH", "MEDIUM", "LOW"]:
-        count = summary["risky_statement_count_by_severity"].get(severity, 0)
-        lines.append(f"| {severity} | {count} |")
-    lines.append("")
-
+    sections = [
+        _header(report["metadata"]),
+        _summary_table(report["summary"]),
+        _severity_table(report["summary"]),
+    ]
     if report["skipped_compartments"]:
-        lines.append("## Skipped Compartments")
-        lines.append("")
-        lines.append("| Compartment OCID | Reason |")
-        lines.append("|---|---|")
-        for item in report["skipped_compartments"]:
-            lines.append(f"| {item['compartment_id']} | {item['reason']} |")
-        lines.append("")
-
-    lines.append("## Top Risky Statements (Top 50)")
-    lines.append("")
-    lines.append("| Severity | Compartment | Policy | Referenced Group | Group Members | Statement |")
-    lines.append("|---|---|---|---|---:|---|")
-    for item in report["risky_policies"][:50]:
-        group_name = item["referenced_group"] or "-"
-        group_members = item["referenced_group_member_count"]
-        group_members_text = str(group_members) if group_members is not None else "-"
-        statement = item["statement"].replace("|", "\\|")
-        lines.append(
-            f"| {item['risk_level']} | {item['compartment_name']} | {item['policy_name']} | "
-            f"{group_name} | {group_members_text} | {statement} |"
-        )
-    if not report["risky_policies"]:
-        lines.append("| - | - | - | - | - | No risky policy statements detected. |")
-    lines.append("")
-
-    lines.append("## Recent IAM Policy Change Events (Top 50)")
-    lines.append("")
-    lines.append("| Event Time (UTC) | Principal | Event Type | Event Name | Resource |")
-    lines.append("|---|---|---|---|---|")
-    for event in report["recent_policy_change_events"][:50]:
-        lines.append(
-            f"| {event['event_time_utc']} | {event['principal_name']} | {event['event_type']} | "
-            f"{event['event_name'] or '-'} | {event['resource_name'] or '-'} |"
-        )
-    if not report["recent_policy_change_events"]:
-        lines.append("| - | - | - | - | No recent IAM policy change events in audit window. |")
-
-    lines.append("")
-    lines.append("## Full Data")
-    lines.append("")
-    lines.append("- Full machine-readable data is available in the JSON artifact.")
-
-    return "\n".join(lines)
+        sections.append(_skipped_table(report["skipped_compartments"]))
+    sections.append(_risky_table(report["risky_policies"]))
+    sections.append(_events_table(report["recent_policy_change_events"]))
+    sections.append("## Full Data\n\n- Full machine-readable data is available in the JSON artifact.")
+    return "\n\n".join(sections)
+
+
+def _header(metadata: dict[str, Any]) -> str:
+    return (
+        "# OCI IAM Policy Drift Auditor Report\n"
+        "\n"
+        f"- Generated (UTC): `{metadata['generated_at_utc']}`\n"
+        f"- Region: `{metadata['region']}`\n"
+        f"- Tenancy: `{metadata['tenancy_ocid']}`\n"
+        f"- Audit Lookback (hours): `{metadata['audit_lookback_hours']}`"
+    )
+
+
+def _summary_table(summary: dict[str, Any]) -> str:
+    return (
+        "## Summary\n"
+        "\n"
+        "| Metric | Value |\n"
+        "|---|---:|\n"
+        f"| Scanned Compartments | {summary['scanned_compartment_count']} |\n"
+        f"| Skipped Compartments | {summary['skipped_compartment_count']} |\n"
+        f"| Policies Scanned | {summary['total_policies_scanned']} |\n"
+        f"| Risky Statements | {summary['risky_statement_count']} |\n"
+        f"| Identity Audit Events | {summary['identity_audit_event_count']} |\n"
+        f"| Policy Change Events | {summary['policy_change_event_count']} |\n"
+        f"| Tenancy Users | {summary['tenancy_user_count']} |\n"
+        f"| Users with MFA Enabled | {summary['tenancy_user_mfa_enabled_count']} |"
+    )
+
+
+def _severity_table(summary: dict[str, Any]) -> str:
+    counts = summary["risky_statement_count_by_severity"]
+    rows = "\n".join(
+        f"| {severity} | {counts.get(severity, 0)} |" for severity in ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+    )
+    return f"## Risk Severity\n\n| Severity | Count |\n|---|---:|\n{rows}"
+
+
+def _skipped_table(skipped_compartments: list[dict[str, str]]) -> str:
+    rows = "\n".join(f"| {item['compartment_id']} | {item['reason']} |" for item in skipped_compartments)
+    return f"## Skipped Compartments\n\n| Compartment OCID | Reason |\n|---|---|\n{rows}"
+
+
+def _risky_table(risky_policies: list[dict[str, Any]]) -> str:
+    rows = "\n".join(_risky_row(item) for item in islice(risky_policies, 50))
+    if not rows:
+        rows = "| - | - | - | - | - | No risky policy statements detected. |"
+    return (
+        "## Top Risky Statements (Top 50)\n"
+        "\n"
+        "| Severity | Compartment | Policy | Referenced Group | Group Members | Statement |\n"
+        "|---|---|---|---|---:|---|\n"
+        f"{rows}"
+    )
+
+
+def _risky_row(item: dict[str, Any]) -> str:
+    group_name = item["referenced_group"] or "-"
+    group_members = item["referenced_group_member_count"]
+    group_members_text = str(group_members) if group_members is not None else "-"
+    statement = item["statement"].replace("|", "\\|")
+    return (
+        f"| {item['risk_level']} | {item['compartment_name']} | {item['policy_name']} | "
+        f"{group_name} | {group_members_text} | {statement} |"
+    )
+
+
+def _events_table(events: list[dict[str, Any]]) -> str:
+    rows = "\n".join(
+        f"| {event['event_time_utc']} | {event['principal_name']} | {event['event_type']} | "
+        f"{event['event_name'] or '-'} | {event['resource_name'] or '-'} |"
+        for event in islice(events, 50)
+    )
+    if not rows:
+        rows = "| - | - | - | - | No recent IAM policy change events in audit window. |"
+    return (
+        "## Recent IAM Policy Change Events (Top 50)\n"
+        "\n"
+        "| Event Time (UTC) | Principal | Event Type | Event Name | Resource |\n"
+        "|---|---|---|---|---|\n"
+        f"{rows}"
+    )
@@ -1,9 +1,14 @@
 ﻿from __future__ import annotations
 
 import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from itertools import count
+import logging
 from pathlib import Path
-from typing import Any
+import sys
+from threading import Lock
+from typing import Any, Callable
 
 from oci.exceptions import ServiceError
 
@@ -11,7 +16,20 @@ from .analyzers import PolicyRiskAnalyzer
 from .clients import create_clients, create_oci_config
 from .collectors import AuditCollector, IdentityCollector
 from .config import AppConfig
-from .helpers import ObjectStorageUploader, write_json_report, write_markdown_report
+from .helpers import (
+    ObjectStorageUploader,
+    get_cached,
+    invalidate_cached,
+    write_gzip_copy,
+    write_json_report,
+    write_markdown_report,
+)
+from .models import CompartmentInfo, PolicyRow
+
+NAMESPACE_CACHE_TTL_SECONDS = 24 * 60 * 60
+BUCKET_CACHE_TTL_SECONDS = 60 * 60
+
+log = logging.getLogger(__name__)
 
 
 def parse_args() -> argparse.Namespace:
@@ -24,45 +42,114 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+class _PrefixFormatter(logging.Formatter):
+    _level_prefixes = {logging.WARNING: "WARN"}
+
+    def __init__(self) -> None:
+        super().__init__("[%(prefix)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.prefix = self._level_prefixes.get(record.levelno, record.levelname)
+        return super().format(record)
+
+
+def configure_logging() -> None:
+    if log.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_PrefixFormatter())
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
 def discover_candidate_buckets(
     object_storage_client: Any,
     namespace: str,
     compartment_ids: list[str],
+    max_candidates: int = 3,
+    max_workers: int = 4,
 ) -> list[str]:
-    seen: set[str] = set()
-    buckets: list[str] = []
-
-    for compartment_id in compartment_ids:
+    def list_bucket_names(compartment_id: str) -> list[str]:
         try:
             response = object_storage_client.list_buckets(
                 namespace_name=namespace,
                 compartment_id=compartment_id,
             )
         except ServiceError:
-            continue
+            return []
+        return [name for name in (getattr(bucket, "name", None) for bucket in response.data) if name]
 
-        for bucket in response.data:
-            name = getattr(bucket, "name", None)
-            if not name or name in seen:
-                continue
-            seen.add(name)
-            buckets.append(name)
+    seen: set[str] = set()
+    buckets: list[str] = []
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for names in executor.map(list_bucket_names, compartment_ids):
+            for name in names:
+                if name in seen:
+                    continue
+                seen.add(name)
+                buckets.append(name)
+                if len(buckets) >= max_candidates:
+                    return sorted(buckets)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     return sorted(buckets)
 
 
+def map_compartments(
+    fetch: Callable[[CompartmentInfo], list[Any]],
+    compartments: list[CompartmentInfo],
+    max_workers: int,
+    description: str,
+) -> list[tuple[CompartmentInfo, list[Any] | Exception]]:
+    total = len(compartments)
+    progress_step = max(1, total // 10)
+    completed = count(1)
+    progress_lock = Lock()
+
+    def fetch_one(compartment: CompartmentInfo) -> tuple[CompartmentInfo, list[Any] | Exception]:
+        try:
+            result: list[Any] | Exception = fetch(compartment)
+        except Exception as exc:  # noqa: BLE001
+            result = exc
+
+        with progress_lock:
+            index = next(completed)
+            log.debug("[%d/%d] Collected %s: %s", index, total, description, compartment.name)
+            if index % progress_step == 0 or index == total:
+                log.info("Collected %s for %d/%d compartments.", description, index, total)
+
+        return compartment, result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch_one, compartments))
+
+
+def result_or_empty(future: Future[list[Any]], call_name: str) -> list[Any]:
+    try:
+        return future.result()
+    except Exception as exc:  # noqa: BLE001
+        log.warning("%s failed: %s", call_name, exc)
+        return []
+
+
 def main() -> int:
     args = parse_args()
+    configure_logging()
 
     try:
         app_config = AppConfig.from_env()
+        log.setLevel(app_config.log_level)
         oci_config = create_oci_config(app_config)
-        clients = create_clients(oci_config)
+        clients = create_clients(oci_config, app_config)
     except Exception as exc:  # noqa: BLE001
-        print(f"[ERROR] Failed to initialize configuration or OCI clients: {exc}")
+        log.error("Failed to initialize configuration or OCI clients: %s", exc)
         return 1
 
-    identity_collector = IdentityCollector(clients["identity"])
+    identity_collector = IdentityCollector(clients["identity"], max_workers=app_config.max_parallel_requests)
     audit_collector = AuditCollector(clients["audit"])
 
     tenancy_ocid = oci_config["tenancy"]
@@ -75,109 +162,114 @@ def main() -> int:
             include_subcompartments=app_config.include_subcompartments,
         )
     except Exception as exc:  # noqa: BLE001
-        print(f"[ERROR] Failed to list compartments: {exc}")
+        log.error("Failed to list compartments: %s", exc)
         return 1
 
-    print(f"[INFO] Discovered {len(compartments)} accessible compartments in scope.")
+    compartments_by_id = {compartment.id: compartment for compartment in compartments}
+    log.info("Discovered %d accessible compartments in scope.", len(compartments))
 
     skipped_compartments: list[dict[str, str]] = []
-    policy_inventory: list[dict[str, Any]] = []
+    policies: list[PolicyRow] = []
 
-    for index, compartment in enumerate(compartments, start=1):
-        print(f"[INFO] [{index}/{len(compartments)}] Collecting policies: {compartment.name}")
-        try:
-            policies = identity_collector.list_policies(compartment.id)
-            for policy in policies:
-                policy_inventory.append({"compartment": compartment, "policy": policy})
-        except ServiceError as exc:
+    log.info("Collecting policies with up to %d parallel requests.", app_config.max_parallel_requests)
+
+    policy_results = map_compartments(
+        lambda compartment: list(identity_collector.list_policies(compartment.id)),
+        compartments,
+        app_config.max_parallel_requests,
+        "policies",
+    )
+
+    for compartment, result in policy_results:
+        if isinstance(result, ServiceError):
             skipped_compartments.append(
                 {
                     "compartment_id": compartment.id,
-                    "reason": f"identity.list_policies failed: {exc.status} {exc.code} {exc.message}",
+                    "reason": f"identity.list_policies failed: {result.status} {result.code} {result.message}",
                 }
             )
-            print(f"[WARN] Could not read policies in compartment {compartment.name}")
-        except Exception as exc:  # noqa: BLE001
+            log.warning("Could not read policies in compartment %s", compartment.name)
+        elif isinstance(result, Exception):
             skipped_compartments.append(
                 {
                     "compartment_id": compartment.id,
-                    "reason": f"identity.list_policies failed: {exc}",
+                    "reason": f"identity.list_policies failed: {result}",
                 }
             )
-            print(f"[WARN] Unexpected policy read error in compartment {compartment.name}: {exc}")
-
-    print("[INFO] Collecting tenancy IAM principal inventory (users, groups, memberships, dynamic groups).")
-
-    try:
-        groups = identity_collector.list_groups(tenancy_ocid)
-    except Exception as exc:  # noqa: BLE001
-        groups = []
-        print(f"[WARN] list_groups failed: {exc}")
-
-    try:
-        users = identity_collector.list_users(tenancy_ocid)
-    except Exception as exc:  # noqa: BLE001
-        users = []
-        print(f"[WARN] list_users failed: {exc}")
-
-    try:
-        user_ids = [user.id for user in users]
-        memberships = identity_collector.list_user_group_memberships_for_users(tenancy_ocid, user_ids)
-    except Exception as exc:  # noqa: BLE001
-        memberships = []
-        print(f"[WARN] list_user_group_memberships_for_users failed: {exc}")
+            log.warning("Unexpected policy read error in compartment %s: %s", compartment.name, result)
+        else:
+            policies.extend(result)
+
+    log.info("Collecting tenancy IAM principal inventory (users, groups, memberships, dynamic groups).")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        groups_future = executor.submit(identity_collector.list_groups, tenancy_ocid)
+        users_future = executor.submit(identity_collector.list_users, tenancy_ocid)
+        dynamic_groups_future = executor.submit(identity_collector.list_dynamic_groups, tenancy_ocid)
+
+        groups = result_or_empty(groups_future, "list_groups")
+        memberships_future = executor.submit(
+            identity_collector.list_user_group_memberships_for_groups,
+            tenancy_ocid,
+            (group.id for group in groups),
+        )
 
-    try:
-        dynamic_groups = identity_collector.list_dynamic_groups(tenancy_ocid)
-    except Exception as exc:  # noqa: BLE001
-        dynamic_groups = []
-        print(f"[WARN] list_dynamic_groups failed: {exc}")
+        users = result_or_empty(users_future, "list_users")
+        memberships = result_or_empty(memberships_future, "list_user_group_memberships_for_groups")
+        dynamic_groups = result_or_empty(dynamic_groups_future, "list_dynamic_groups")
 
     generated_at = datetime.now(timezone.utc)
     start_time = generated_at - timedelta(hours=app_config.audit_lookback_hours)
     end_time = generated_at
 
-    print(
-        "[INFO] Collecting Audit events "
-        f"from {start_time.isoformat()} to {end_time.isoformat()} for scoped compartments."
+    log.info(
+        "Collecting Audit events from %s to %s for scoped compartments.",
+        start_time.isoformat(),
+        end_time.isoformat(),
     )
 
-    audit_events: list[Any] = []
-    seen_event_ids: set[str] = set()
+    events_by_id: dict[Any, Any] = {}
 
-    for compartment in compartments:
-        try:
-            events = audit_collector.list_events(
+    event_results = map_compartments(
+        lambda compartment: list(
+            audit_collector.list_events(
                 compartment_ocid=compartment.id,
                 start_time=start_time,
                 end_time=end_time,
             )
-        except ServiceError as exc:
-            print(
-                "[WARN] audit.list_events failed for "
-                f"{compartment.name}: {exc.status} {exc.code} {exc.message}"
+        ),
+        compartments,
+        app_config.max_parallel_requests,
+        "audit events",
+    )
+
+    for compartment, events in event_results:
+        if isinstance(events, ServiceError):
+            log.warning(
+                "audit.list_events failed for %s: %s %s %s",
+                compartment.name,
+                events.status,
+                events.code,
+                events.message,
             )
             continue
-        except Exception as exc:  # noqa: BLE001
-            print(f"[WARN] audit.list_events failed for {compartment.name}: {exc}")
+        if isinstance(events, Exception):
+            log.warning("audit.list_events failed for %s: %s", compartment.name, events)
             continue
 
         for event in events:
-            event_id = getattr(event, "event_id", None)
-            if event_id and event_id in seen_event_ids:
-                continue
-            if event_id:
-                seen_event_ids.add(event_id)
-            audit_events.append(event)
-
-    analyzer = PolicyRiskAnalyzer()
+            events_by_id.setdefault(getattr(event, "event_id", None) or id(event), event)
+
+    audit_events = list(events_by_id.values())
+
+    analyzer = PolicyRiskAnalyzer(stop_on_critical=app_config.stop_on_critical)
     report = analyzer.analyze(
         generated_at=generated_at,
         region=region,
         tenancy_ocid=tenancy_ocid,
         audit_lookback_hours=app_config.audit_lookback_hours,
-        compartments=compartments,
-        policy_inventory=policy_inventory,
+        compartments_by_id=compartments_by_id,
+        policies=policies,
         groups=groups,
         users=users,
         memberships=memberships,
@@ -191,41 +283,72 @@ def main() -> int:
     json_path = output_dir / f"iam_policy_drift_audit_{timestamp}.json"
     markdown_path = output_dir / f"iam_policy_drift_audit_{timestamp}.md"
 
-    write_json_report(report, json_path)
-    write_markdown_report(report, markdown_path)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        json_write = executor.submit(write_json_report, report, json_path)
+        markdown_write = executor.submit(write_markdown_report, report, markdown_path)
+        json_write.result()
+        markdown_write.result()
 
-    print(f"[INFO] JSON report written: {json_path}")
-    print(f"[INFO] Markdown report written: {markdown_path}")
+    log.info("JSON report written: %s", json_path)
+    log.info("Markdown report written: %s", markdown_path)
 
     if args.skip_upload:
-        print("[INFO] Upload skipped (--skip-upload).")
+        log.info("Upload skipped (--skip-upload).")
         return 0
 
     try:
-        namespace = app_config.object_storage_namespace or clients["object_storage"].get_namespace().data
+        namespace = app_config.object_storage_namespace or get_cached(
+            app_config.discovery_cache_file,
+            f"namespace:{tenancy_ocid}",
+            NAMESPACE_CACHE_TTL_SECONDS,
+            lambda: clients["object_storage"].get_namespace().data,
+        )
     except Exception as exc:  # noqa: BLE001
-        print(f"[ERROR] Could not resolve Object Storage namespace: {exc}")
+        log.error("Could not resolve Object Storage namespace: %s", exc)
         return 2 if app_config.fail_on_upload_error else 0
 
     bucket_candidates: list[str] = []
     if app_config.object_storage_bucket:
         bucket_candidates.append(app_config.object_storage_bucket)
 
+    bucket_cache_key = (
+        f"buckets:{tenancy_ocid}:{region}:"
+        f"{app_config.root_compartment_ocid or tenancy_ocid}:{app_config.include_subcompartments}:"
+        f"{app_config.max_bucket_candidates}"
+    )
+    discovered_buckets: set[str] = set()
     if app_config.auto_discover_bucket:
-        discovered = discover_candidate_buckets(
-            object_storage_client=clients["object_storage"],
-            namespace=namespace,
-            compartment_ids=[item.id for item in compartments],
+        discovered = get_cached(
+            app_config.discovery_cache_file,
+            bucket_cache_key,
+            BUCKET_CACHE_TTL_SECONDS,
+            lambda: discover_candidate_buckets(
+                object_storage_client=clients["object_storage"],
+                namespace=namespace,
+                compartment_ids=[item.id for item in compartments],
+                max_candidates=app_config.max_bucket_candidates,
+                max_workers=min(app_config.max_parallel_requests, app_config.max_bucket_candidates),
+            ),
         )
+        discovered_buckets.update(discovered)
+        seen_buckets = set(bucket_candidates)
         for bucket in discovered:
-            if bucket not in bucket_candidates:
+            if bucket not in seen_buckets:
+                seen_buckets.add(bucket)
                 bucket_candidates.append(bucket)
 
     if not bucket_candidates:
-        print("[ERROR] No accessible bucket found for upload.")
-        print("[ERROR] Set OCI_OBJECT_STORAGE_BUCKET or allow list_buckets access in scope.")
+        log.error("No accessible bucket found for upload.")
+        log.error("Set OCI_OBJECT_STORAGE_BUCKET or allow list_buckets access in scope.")
         return 2 if app_config.fail_on_upload_error else 0
 
+    json_upload_path = json_path
+    json_encoding: str | None = None
+    if app_config.gzip_json_upload:
+        json_upload_path = write_gzip_copy(json_path)
+        json_encoding = "gzip"
+        log.info("Compressed JSON report for upload: %s", json_upload_path)
+
     upload_success = False
     last_upload_error: str | None = None
 
@@ -237,23 +360,30 @@ def main() -> int:
             prefix=app_config.object_storage_prefix,
         )
 
-        print(f"[INFO] Attempting report upload to bucket: {bucket}")
+        log.info("Attempting report upload to bucket: %s", bucket)
 
         try:
-            json_result = uploader.upload_file(json_path, "application/json")
-            md_result = uploader.upload_file(markdown_path, "text/markdown")
-            print(f"[INFO] Uploaded: {json_result.uri}")
-            print(f"[INFO] Uploaded: {md_result.uri}")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                json_upload = executor.submit(
+                    uploader.upload_file, json_upload_path, "application/json", content_encoding=json_encoding
+                )
+                md_upload = executor.submit(uploader.upload_file, markdown_path, "text/markdown")
+                json_result = json_upload.result()
+                md_result = md_upload.result()
+            log.info("Uploaded: %s", json_result.uri)
+            log.info("Uploaded: %s", md_result.uri)
             upload_success = True
             break
         except Exception as exc:  # noqa: BLE001
             last_upload_error = str(exc)
-            print(f"[WARN] Upload attempt failed for bucket {bucket}: {exc}")
+            log.warning("Upload attempt failed for bucket %s: %s", bucket, exc)
+            if isinstance(exc, ServiceError) and exc.status == 404 and bucket in discovered_buckets:
+                invalidate_cached(app_config.discovery_cache_file, bucket_cache_key)
 
     if not upload_success:
-        print("[ERROR] Upload failed for all candidate buckets.")
+        log.error("Upload failed for all candidate buckets.")
         if last_upload_error:
-            print(f"[ERROR] Last upload error: {last_upload_error}")
+            log.error("Last upload error: %s", last_upload_error)
         if app_config.fail_on_upload_error:
             return 2
 
@@ -3,12 +3,21 @@
 from dataclasses import dataclass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CompartmentInfo:
     id: str
     name: str
 
 
+@dataclass(frozen=True, slots=True)
+class PolicyRow:
+    compartment_id: str
+    id: str
+    name: str
+    description: str | None
+    statements: tuple[str, ...]
+
+
 @dataclass(frozen=True)
 class UploadResult:
     namespace: str